@@ -12,15 +12,42 @@ Best practices folded in:
 - Robust attribute access (avoid crashes on missing fields)
 - Progress bars and small, readable helpers
 - Consistent, tidy CSV schemas
+- Optional pool of API clients to fetch comment forests in parallel threads
 """
 
+import io
 import os
+import csv
+import time
+import zlib
+import queue
+import sqlite3
 import argparse
-from typing import List, Set, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Set, Optional, Sequence, Tuple
 
 import pandas as pd
+import requests
 from tqdm import tqdm
 
+try:
+    from orjson import dumps as json_dumps, loads as json_loads  # optional, faster JSON
+except ImportError:
+    import json
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    json_loads = json.loads
+
+try:
+    import zstandard  # optional, used for cached forests and .zst output
+except ImportError:
+    zstandard = None
+
 try:
     from dotenv import load_dotenv  # optional
     load_dotenv()
@@ -29,83 +56,336 @@ except Exception:
 
 import praw
 
+# per-comment predicates; compiled by mypyc when built (see _hot.py)
+from _hot import flair_is_delta_from_op, has_delta_lower
+
 
 # -------------------------
 # Auth
 # -------------------------
 
-def get_reddit() -> praw.Reddit:
-    """Create a Reddit client from environment variables.
+def _make_client(cid: str, csec: str, ua: str) -> praw.Reddit:
+    return praw.Reddit(
+        client_id=cid,
+        client_secret=csec,
+        user_agent=ua,
+        check_for_async=False,
+    )
+
+
+def get_reddit() -> List[praw.Reddit]:
+    """Create a pool of Reddit clients from environment variables.
 
     Set before running (e.g. in your shell or .env):
         export REDDIT_CLIENT_ID="..."
         export REDDIT_CLIENT_SECRET="..."
         export REDDIT_USER_AGENT="changemyview-data-lab/0.1 by YOUR_NAME"
+
+    For parallel fetching, add numbered credentials for each extra app:
+        export REDDIT_CLIENT_ID_0="..."  REDDIT_CLIENT_SECRET_0="..."
+        export REDDIT_CLIENT_ID_1="..."  REDDIT_CLIENT_SECRET_1="..."
+    Numbering starts at 0 and stops at the first gap. The unnumbered pair,
+    if set, is always part of the pool; a numbered entry repeating its
+    client id is skipped.
     """
+    ua = os.getenv('REDDIT_USER_AGENT', 'changemyview-data-lab/0.1')
+
+    creds = []
     cid = os.getenv('REDDIT_CLIENT_ID')
     csec = os.getenv('REDDIT_CLIENT_SECRET')
-    ua = os.getenv('REDDIT_USER_AGENT', 'changemyview-data-lab/0.1')
+    if cid and csec:
+        creds.append((cid, csec))
+    i = 0
+    while True:
+        cid = os.getenv(f'REDDIT_CLIENT_ID_{i}')
+        csec = os.getenv(f'REDDIT_CLIENT_SECRET_{i}')
+        if not cid or not csec:
+            break
+        if cid not in {c for c, _ in creds}:
+            creds.append((cid, csec))
+        i += 1
 
-    if not cid or not csec:
+    if not creds:
         raise RuntimeError('Missing REDDIT_CLIENT_ID or REDDIT_CLIENT_SECRET')
 
-    return praw.Reddit(
-        client_id=cid,
-        client_secret=csec,
-        user_agent=ua,
-        check_for_async=False,
-    )
+    clients = [_make_client(cid, csec, ua) for cid, csec in creds]
+    return clients
+
+
+class TokenBucket:
+    """Thread-safe token bucket: at most `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: int = 60, per: float = 60.0):
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.fill_rate = rate / per
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.fill_rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
 
 
 # -------------------------
 # Utilities
 # -------------------------
 
-def flair_is_delta_from_op(flair: Optional[str]) -> bool:
-    """Heuristic: submissions whose flair text mentions a delta from OP."""
-    if not flair:
-        return False
-    t = str(flair).strip().lower()
-    return ('delta' in t) and ('from op' in t)
+def author_name(thing) -> Optional[str]:
+    """Author name of a submission/comment without triggering a lazy fetch.
+
+    PRAW builds the `author` Redditor from the listing JSON with its name
+    already set; reading it from `__dict__` never touches the network, and
+    deleted accounts come back as None.
+    """
+    return _author_to_name(thing.__dict__.get('author'))
+
+
+def _author_to_name(author) -> Optional[str]:
+    """Name from a PRAW Redditor or a raw JSON author string ('[deleted]' -> None)."""
+    if author is None:
+        return None
+    if isinstance(author, str):
+        return None if author == '[deleted]' else author
+    return author.__dict__.get('name') or str(author)
+
+
+# -------------------------
+# Output
+# -------------------------
+
+# Arrow types for the comment rows; pyarrow is only imported for parquet output
+COMMENT_ARROW_TYPES = {
+    'comment_id': 'string', 'post_id': 'string', 'parent_comment_id': 'string',
+    'score': 'int64', 'author': 'string', 'is_op': 'bool', 'delta_awarded': 'bool',
+    'body': 'string', 'permalink': 'string', 'created_utc': 'float64', 'depth': 'int64',
+}
 
 
-# A small but practical list of delta cues (example .py + a couple extras)
-DELTA_TOKENS: List[str] = [
-    '∆', '\u2206', '!delta', 'delta awarded', 'i award you a delta',
-    'i award a delta', "i'm awarding a delta", 'i am awarding a delta'
-]
+def write_frame(df: pd.DataFrame, outfile: str, fmt: str = 'csv') -> None:
+    """Write a finished dataframe as CSV or zstd-compressed Parquet.
+
+    A `.zst` CSV path is compressed by pandas on the fly; rows are formatted
+    in chunks to bound peak memory.
+    """
+    Path(outfile).parent.mkdir(parents=True, exist_ok=True)
+    if fmt == 'parquet':
+        df.to_parquet(outfile, index=False, engine='pyarrow', compression='zstd')
+    else:
+        df.to_csv(outfile, index=False, chunksize=10_000)
 
-def has_delta(text: Optional[str]) -> bool:
-    """Does the text look like an OP awarding a delta?"""
-    if not text:
-        return False
-    t = str(text).lower()
-    return any(tok in t for tok in DELTA_TOKENS)
+
+def read_frame(path: str, columns: List[str], dtype: Dict[str, str], optional: Sequence[str] = ()) -> pd.DataFrame:
+    """Read selected columns back from a file written by write_frame().
+
+    Columns listed in `optional` are read only if the file has them.
+    """
+    if optional:
+        if Path(path).suffix == '.parquet':
+            import pyarrow.parquet as pq
+            present = set(pq.read_schema(path).names)
+        else:
+            present = set(pd.read_csv(path, nrows=0).columns)
+        columns = columns + [c for c in optional if c in present]
+    dtype = {k: v for k, v in dtype.items() if k in columns}
+    if Path(path).suffix == '.parquet':
+        return pd.read_parquet(path, columns=columns).astype(dtype)
+    return pd.read_csv(path, usecols=columns, dtype=dtype, engine='c')
+
+
+@contextmanager
+def open_row_writer(outfile: str, fieldnames: List[str], fmt: str = 'csv', batch_rows: Optional[int] = None):
+    """Yield a `write_rows(rows)` callable that streams row sequences to `outfile`.
+
+    Rows are tuples/lists in `fieldnames` order. They are buffered and handed
+    over in batches of `batch_rows` (default 1000 for CSV, 10k per Parquet row
+    group). CSV goes through `csv.writer.writerows`; a path ending in `.zst`
+    is zstd-compressed as it is written (needs `zstandard`). For Parquet each
+    call is converted straight to a columnar Arrow record batch, so only
+    contiguous column buffers are held until the row group is written.
+    """
+    Path(outfile).parent.mkdir(parents=True, exist_ok=True)
+
+    if fmt == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, pa.type_for_alias(COMMENT_ARROW_TYPES[name])) for name in fieldnames])
+        writer = pq.ParquetWriter(outfile, schema, compression='zstd')
+        batch_rows = batch_rows or 10_000
+        batches: List[pa.RecordBatch] = []
+        n_pending = 0
+
+        def flush() -> None:
+            nonlocal n_pending
+            if batches:
+                writer.write_table(pa.Table.from_batches(batches, schema=schema))
+                batches.clear()
+                n_pending = 0
+
+        def write_rows(rows: List[Sequence]) -> None:
+            nonlocal n_pending
+            if not rows:
+                return
+            columns = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)]
+            batches.append(pa.RecordBatch.from_arrays(columns, schema=schema))
+            n_pending += len(rows)
+            if n_pending >= batch_rows:
+                flush()
+
+        try:
+            yield write_rows
+            flush()
+        finally:
+            writer.close()
+        return
+
+    if outfile.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError('Writing .zst output needs the zstandard package')
+        raw = zstandard.ZstdCompressor(level=3).stream_writer(open(outfile, 'wb'))
+        f = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    else:
+        f = open(outfile, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+    w = csv.writer(f)
+    w.writerow(fieldnames)
+    batch_rows = batch_rows or 1000
+    pending: List[Sequence] = []
+
+    def write_rows(rows: List[Sequence]) -> None:
+        pending.extend(rows)
+        if len(pending) >= batch_rows:
+            w.writerows(pending)
+            pending.clear()
+
+    try:
+        yield write_rows
+        if pending:
+            w.writerows(pending)
+    finally:
+        f.close()
 
 
 # -------------------------
 # Submissions
 # -------------------------
 
-def fetch_top_submissions(reddit: praw.Reddit, subreddit_name: str, time_filter: str, limit: int) -> pd.DataFrame:
-    """Fetch top submissions and return a tidy dataframe."""
+SUBMISSION_FIELDS = [
+    'id','title','author','permalink','url','created_utc','score',
+    'num_comments','upvote_ratio','link_flair_text','total_awards_received'
+]
+
+
+def submission_row(s) -> tuple:
+    """One submission as a tuple in SUBMISSION_FIELDS order (no per-row dict).
+
+    Fields are read from the instance `__dict__` PRAW filled from the listing
+    JSON; a missing key is None rather than a lazy fetch of the whole object.
+    """
+    d = s.__dict__
+    return (
+        d.get('id'),
+        d.get('title') or '',
+        author_name(s),
+        f"https://reddit.com{d.get('permalink') or ''}",
+        d.get('url'),
+        d.get('created_utc'),
+        d.get('score'),
+        d.get('num_comments'),
+        d.get('upvote_ratio'),
+        d.get('link_flair_text'),
+        d.get('total_awards_received'),
+    )
+
+
+def fetch_top_submissions(
+    reddit: praw.Reddit,
+    subreddit_name: str,
+    time_filter: str,
+    limit: int,
+    on_row: Optional[Callable[[tuple], None]] = None,
+) -> pd.DataFrame:
+    """Fetch top submissions and return a tidy dataframe.
+
+    `on_row`, if given, is called with each row tuple as soon as it is fetched.
+    """
     sub = reddit.subreddit(subreddit_name)
     rows = []
-    for s in tqdm(sub.top(time_filter=time_filter, limit=limit), total=limit, desc='Top submissions'):
-        rows.append({
-            'id': getattr(s, 'id', None),
-            'title': getattr(s, 'title', '') or '',
-            'author': str(getattr(s, 'author', None)) if getattr(s, 'author', None) else None,
-            'permalink': f"https://reddit.com{getattr(s, 'permalink', '')}",
-            'url': getattr(s, 'url', None),
-            'created_utc': getattr(s, 'created_utc', None),
-            'score': getattr(s, 'score', None),
-            'num_comments': getattr(s, 'num_comments', None),
-            'upvote_ratio': getattr(s, 'upvote_ratio', None),
-            'link_flair_text': getattr(s, 'link_flair_text', None),
-            'total_awards_received': getattr(s, 'total_awards_received', None),
-        })
-    return pd.DataFrame(rows)
+    # redraw at most ~200 times instead of on every item
+    listing = sub.top(time_filter=time_filter, limit=limit)
+    for s in tqdm(listing, total=limit, desc='Top submissions', mininterval=0.5, miniters=max(1, limit // 200)):
+        row = submission_row(s)
+        rows.append(row)
+        if on_row is not None:
+            on_row(row)
+    return pd.DataFrame(rows, columns=SUBMISSION_FIELDS)
+
+
+# Pushshift is restricted to moderators these days; Arctic Shift serves the
+# same search API shape (`data` list, after/before paging) and is public.
+PUSHSHIFT_URL = 'https://arctic-shift.photon-reddit.com/api/posts/search'
+
+
+def fetch_ids_from_pushshift(
+    subreddit_name: str,
+    after: int,
+    before: int,
+    base_url: str = PUSHSHIFT_URL,
+    page_size: int = 100,
+) -> List[str]:
+    """List submission ids in [after, before) (epoch seconds) from a Pushshift-style archive.
+
+    Pages forward in time by moving `after` to the newest timestamp seen.
+    """
+    ids: List[str] = []
+    seen: Set[str] = set()
+    with requests.Session() as session, tqdm(desc='Archive ids') as bar:
+        while after < before:
+            resp = session.get(base_url, params={
+                'subreddit': subreddit_name,
+                'after': after,
+                'before': before,
+                'sort': 'asc',
+                'limit': page_size,
+                'fields': 'id,created_utc',
+            }, timeout=30)
+            resp.raise_for_status()
+            data = resp.json().get('data') or []
+            new = [d for d in data if d['id'] not in seen]
+            if not new:
+                break
+            for d in new:
+                seen.add(d['id'])
+                ids.append(d['id'])
+            bar.update(len(new))
+            after = int(max(d['created_utc'] for d in data))
+    return ids
+
+
+def fetch_submissions_by_ids(
+    reddit: praw.Reddit,
+    ids: List[str],
+    chunk_size: int = 100,
+    on_row: Optional[Callable[[tuple], None]] = None,
+) -> pd.DataFrame:
+    """Hydrate submission ids via /api/info, up to 100 fullnames per request."""
+    rows = []
+    for i in tqdm(range(0, len(ids), chunk_size), desc='Hydrating submissions'):
+        fullnames = [f't3_{sid}' for sid in ids[i:i + chunk_size]]
+        for s in reddit.info(fullnames=fullnames):
+            row = submission_row(s)
+            rows.append(row)
+            if on_row is not None:
+                on_row(row)
+    return pd.DataFrame(rows, columns=SUBMISSION_FIELDS)
 
 
 def build_submissions_csv(
@@ -114,16 +394,37 @@ def build_submissions_csv(
     subreddit_name: str = 'changemyview',
     time_filter: str = 'all',
     limit: int = 1000,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    fmt: str = 'csv',
+    on_row: Optional[Callable[[tuple], None]] = None,
 ) -> pd.DataFrame:
-    """Create a submissions CSV with a simple 'has_delta_from_op' flag from flair."""
-    df = fetch_top_submissions(reddit, subreddit_name, time_filter, limit)
+    """Create a submissions CSV with a simple 'has_delta_from_op' flag from flair.
+
+    With `after`/`before` (epoch seconds), ids come from the Pushshift-style
+    archive instead of the top listing, so the 1000-item cap does not apply
+    and `time_filter`/`limit` are ignored. `fmt='parquet'` writes Parquet instead.
+    `on_row` is passed through to the fetcher (see build_all_pipelined).
+    """
+    if after is not None or before is not None:
+        ids = fetch_ids_from_pushshift(
+            subreddit_name,
+            after=after if after is not None else 0,
+            before=before if before is not None else int(time.time()),
+        )
+        df = fetch_submissions_by_ids(reddit, ids, on_row=on_row)
+    else:
+        df = fetch_top_submissions(reddit, subreddit_name, time_filter, limit, on_row=on_row)
     if df.empty:
-        Path(outfile).parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(outfile, index=False)
+        write_frame(df, outfile, fmt)
         print(f'Wrote 0 rows to {outfile}')
         return df
 
-    df['has_delta_from_op'] = df['link_flair_text'].apply(flair_is_delta_from_op)
+    # vectorized equivalent of flair_is_delta_from_op over the whole column
+    flair = df['link_flair_text'].fillna('').astype(str).str.lower()
+    df['has_delta_from_op'] = (
+        flair.str.contains('delta', regex=False) & flair.str.contains('from op', regex=False)
+    )
     # keep only posts with a real OP
     df = df[df['author'].notna()]
 
@@ -134,8 +435,7 @@ def build_submissions_csv(
     ]
     out = df[cols].copy()
 
-    Path(outfile).parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(outfile, index=False)
+    write_frame(out, outfile, fmt)
     print(f'Wrote {len(out)} rows to {outfile}')
     return out
 
@@ -144,77 +444,507 @@ def build_submissions_csv(
 # Comments
 # -------------------------
 
-def build_comments_csv(
+COMMENT_FIELDS = [
+    'comment_id','post_id','parent_comment_id','score','author','is_op',
+    'delta_awarded','body','permalink','created_utc','depth'
+]
+_DELTA_AWARDED = COMMENT_FIELDS.index('delta_awarded')
+
+
+def comment_rows(sid: str, op: str, comments: Iterable[dict]) -> List[list]:
+    """Turn comment field dicts into rows (COMMENT_FIELDS order).
+
+    Single pass over the forest: every comment is emitted with
+    'delta_awarded' False and its row index remembered. When an OP comment
+    awards a delta, the parent's row is patched in place, or, if the parent
+    has not been emitted yet, its id is parked until it is.
+    """
+    rows = []
+    row_idx_by_comment_id: Dict[str, int] = {}
+    pending_awards: Set[str] = set()
+    for d in comments:
+        c_id = d.get('id')
+        c_author = _author_to_name(d.get('author'))
+        c_body = d.get('body') or ''
+        parent_full = d.get('parent_id') or ''
+        parent_comment_id = parent_full[3:] if parent_full.startswith('t1_') else None
+
+        row_idx_by_comment_id[c_id] = len(rows)
+        # list in COMMENT_FIELDS order; mutable so delta_awarded can be patched
+        rows.append([
+            c_id,
+            sid,
+            parent_comment_id,
+            d.get('score'),
+            c_author,
+            c_author == op,
+            c_id in pending_awards,
+            c_body,
+            f"https://reddit.com{d.get('permalink') or ''}",
+            d.get('created_utc'),
+            d.get('depth'),
+        ])
+
+        # only OP replies can award a delta, so only those bodies get lowercased
+        if parent_comment_id and (c_author == op) and has_delta_lower(c_body.lower()):
+            idx = row_idx_by_comment_id.get(parent_comment_id)
+            if idx is not None:
+                rows[idx][_DELTA_AWARDED] = True
+            else:
+                pending_awards.add(parent_comment_id)
+    return rows
+
+
+COMMENTS_JSON_URL = 'https://www.reddit.com/comments/{sid}.json'
+# the public endpoint is limited per IP, not per OAuth app
+JSON_REQUESTS_PER_MINUTE = 10
+
+_thread_state = threading.local()
+
+
+def _json_session() -> requests.Session:
+    """One HTTP session per worker thread for the .json endpoint."""
+    session = getattr(_thread_state, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['User-Agent'] = os.getenv('REDDIT_USER_AGENT', 'changemyview-data-lab/0.1')
+        _thread_state.session = session
+    return session
+
+
+def fetch_comment_tree_json(
+    sid: str,
+    session: requests.Session,
+    limit: int = 500,
+    retries: int = 5,
+) -> List[dict]:
+    """Fetch a submission's comment tree from Reddit's public .json endpoint.
+
+    429 and 5xx responses are retried up to `retries` times, waiting for the
+    server's Retry-After or an exponential backoff (capped at 60s).
+    Walks the nested `replies` listings depth-first and returns the raw
+    comment `data` dicts; "load more" stubs (kind 'more') are skipped.
+    """
+    for attempt in range(retries + 1):
+        resp = session.get(
+            COMMENTS_JSON_URL.format(sid=sid),
+            params={'limit': limit, 'sort': 'top', 'raw_json': 1},
+            timeout=30,
+        )
+        if resp.status_code != 429 and resp.status_code < 500:
+            break
+        if attempt == retries:
+            break
+        retry_after = resp.headers.get('Retry-After', '')
+        wait = float(retry_after) if retry_after.isdigit() else min(60.0, 2.0 ** attempt)
+        time.sleep(wait)
+    resp.raise_for_status()
+    _, comments_listing = json_loads(resp.content)
+
+    out: List[dict] = []
+    stack = list(reversed(comments_listing['data']['children']))
+    while stack:
+        node = stack.pop()
+        if node.get('kind') != 't1':
+            continue
+        data = node['data']
+        out.append(data)
+        replies = data.get('replies')
+        if replies:  # '' when there are none
+            stack.extend(reversed(replies['data']['children']))
+    return out
+
+
+def fetch_submission_comments(
     reddit: praw.Reddit,
+    sid: str,
+    op: str,
+    replace_more_limit: int = 5,
+    replace_more_threshold: int = 10,
+    source: str = 'praw',
+) -> List[list]:
+    """Fetch one submission's comment forest and return its rows (COMMENT_FIELDS order).
+
+    `source='json'` reads the tree from the .json endpoint in one request
+    instead of building PRAW objects; "load more" stubs are not expanded there,
+    so the replace_more settings do not apply.
+    """
+    if source == 'json':
+        return comment_rows(sid, op, fetch_comment_tree_json(sid, _json_session()))
+
+    subm = reddit.submission(id=sid)
+    subm.comment_sort = 'top'
+    subm.comments.replace_more(limit=replace_more_limit, threshold=replace_more_threshold)
+    # listing JSON as set by PRAW on each instance; never lazy-fetches
+    return comment_rows(sid, op, (c.__dict__ for c in subm.comments.list()))
+
+
+def comment_count(value) -> Optional[int]:
+    """`num_comments` as an int, or None when missing (None/NaN/NA)."""
+    if value is None or pd.isna(value):
+        return None
+    return int(value)
+
+
+def fetch_params(source: str, replace_more_limit: int, replace_more_threshold: int) -> str:
+    """Cache key for the settings that shape a fetched forest."""
+    if source == 'json':
+        return 'json'  # replace_more does not apply to the .json endpoint
+    return f'praw:limit={replace_more_limit}:threshold={replace_more_threshold}'
+
+
+class ForestCache:
+    """SQLite cache of per-submission comment rows, shared by the worker threads.
+
+    Each forest is stored as a compressed JSON list of rows (COMMENT_FIELDS
+    order) keyed by submission id and the fetch settings that produced it
+    (see fetch_params), so changing the source or replace_more settings is a
+    miss rather than a stale hit. The submission's `num_comments` at fetch
+    time is stored too: when the thread has changed since, or the current
+    count is unknown, the entry is a miss and gets refetched. Entries older
+    than `max_age` seconds are also treated as missing. Compression is zstd
+    when `zstandard` is installed, otherwise zlib, and the codec is stored
+    next to each blob.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(forests)')]
+        if columns and 'num_comments' not in columns:
+            # cache from an older layout without a freshness signal; start over
+            self.conn.execute('DROP TABLE forests')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS forests '
+            '(sid TEXT, params TEXT, num_comments INTEGER, fetched_utc REAL, codec TEXT, blob BLOB, '
+            'PRIMARY KEY (sid, params))'
+        )
+        self.conn.commit()
+
+    def get(self, sid: str, params: str, num_comments: Optional[int]) -> Optional[List[list]]:
+        if num_comments is None:
+            return None  # cannot tell whether the thread changed
+        with self.lock:
+            hit = self.conn.execute(
+                'SELECT num_comments, fetched_utc, codec, blob FROM forests WHERE sid = ? AND params = ?',
+                (sid, params),
+            ).fetchone()
+        if hit is None:
+            return None
+        cached_count, fetched_utc, codec, blob = hit
+        if cached_count != num_comments:
+            return None
+        if self.max_age is not None and time.time() - fetched_utc > self.max_age:
+            return None
+        if codec == 'zstd':
+            if zstandard is None:
+                return None
+            raw = zstandard.ZstdDecompressor().decompress(blob)
+        else:
+            raw = zlib.decompress(blob)
+        return json_loads(raw)
+
+    def put(self, sid: str, params: str, num_comments: Optional[int], rows: List[list]) -> None:
+        raw = json_dumps(rows)
+        if zstandard is not None:
+            codec, blob = 'zstd', zstandard.ZstdCompressor(level=3).compress(raw)
+        else:
+            codec, blob = 'zlib', zlib.compress(raw)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO forests (sid, params, num_comments, fetched_utc, codec, blob) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (sid, params, num_comments, time.time(), codec, blob),
+            )
+            self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def make_client_pool(clients: List[praw.Reddit], submissions_per_minute: int = 60) -> "queue.Queue[Tuple[praw.Reddit, TokenBucket]]":
+    """Queue of (client, rate limiter) pairs; a thread checks one out per fetch.
+
+    Each limiter admits `submissions_per_minute` comment forests per client.
+    A forest costs one request plus one per `replace_more` expansion; PRAW's
+    own limiter paces those individual requests against Reddit's quota.
+    """
+    pool: "queue.Queue[Tuple[praw.Reddit, TokenBucket]]" = queue.Queue()
+    for client in clients:
+        pool.put((client, TokenBucket(rate=submissions_per_minute, per=60.0)))
+    return pool
+
+
+def scan_comments(
+    pool: "queue.Queue[Tuple[praw.Reddit, TokenBucket]]",
+    n_workers: int,
+    targets: Iterable[Tuple[str, str, bool, Optional[int]]],
+    outfile: str,
+    max_comments: int = 1000,
+    replace_more_limit: int = 5,
+    replace_more_threshold: int = 10,
+    fmt: str = 'csv',
+    expected: Optional[int] = None,
+    delta_only: bool = False,
+    source: str = 'praw',
+    cache_db: Optional[str] = None,
+    cache_max_age: Optional[float] = None,
+    json_requests_per_minute: int = JSON_REQUESTS_PER_MINUTE,
+) -> int:
+    """Fetch comment forests for `(submission id, OP, has_delta_from_op, num_comments)` and stream them to `outfile`.
+
+    `targets` may be a blocking iterator; each one is dispatched as soon as it
+    arrives. Workers check a client out of `pool`, wait on its per-forest limiter,
+    fetch the forest, return the client and write their rows under a shared
+    lock until `max_comments` is reached. Returns the row count.
+
+    Submissions whose flair shows no delta from OP are fetched without
+    expanding "load more" stubs (`replace_more` limit 0), or skipped entirely
+    with `delta_only`. `source` is passed to fetch_submission_comments; with
+    `source='json'` all workers share one limiter of `json_requests_per_minute`,
+    since the unauthenticated endpoint's quota does not grow with the pool.
+
+    With `cache_db`, forests are looked up in a ForestCache before any request
+    is made and written through after each fetch; `num_comments` decides
+    whether a cached forest is still current.
+    """
+    total = 0
+    lock = threading.Lock()
+    cache = ForestCache(cache_db, max_age=cache_max_age) if cache_db else None
+    json_bucket = TokenBucket(rate=json_requests_per_minute, per=60.0) if source == 'json' else None
+
+    with closing(cache) if cache else nullcontext(), \
+            open_row_writer(outfile, COMMENT_FIELDS, fmt) as write_rows, \
+            tqdm(total=expected, desc='Scanning submissions', mininterval=0.5,
+                 miniters=max(1, (expected or 0) // 200)) as bar, \
+            ThreadPoolExecutor(max_workers=n_workers) as ex:
+
+        def work(sid: str, op: str, flagged: bool, num_comments: Optional[int]) -> None:
+            nonlocal total
+            with lock:
+                if total >= max_comments:
+                    return
+            more_limit = replace_more_limit if flagged else 0
+            params = fetch_params(source, more_limit, replace_more_threshold)
+            sub_rows = cache.get(sid, params, num_comments) if cache else None
+            if sub_rows is None:
+                client, bucket = pool.get()
+                try:
+                    (json_bucket or bucket).acquire()
+                    sub_rows = fetch_submission_comments(
+                        client, sid, op,
+                        replace_more_limit=more_limit,
+                        replace_more_threshold=replace_more_threshold,
+                        source=source,
+                    )
+                finally:
+                    pool.put((client, bucket))
+                if cache:
+                    cache.put(sid, params, num_comments, sub_rows)
+            with lock:
+                room = max_comments - total
+                write_rows(sub_rows[:room])
+                total += min(len(sub_rows), room)
+                bar.update(1)
+
+        futures = []
+        for sid, op, flagged, num_comments in targets:
+            if delta_only and not flagged:
+                bar.update(1)
+                continue
+            with lock:
+                if total >= max_comments:
+                    break
+            futures.append(ex.submit(work, sid, op, bool(flagged), comment_count(num_comments)))
+        for fu in futures:
+            fu.result()  # re-raise worker errors
+
+    print(f'Wrote {total} rows to {outfile}')
+    return total
+
+
+def build_comments_csv(
+    clients: List[praw.Reddit],
     submissions_csv: str,
     outfile: str,
     n_submissions: int = 50,
     max_comments: int = 1000,
     replace_more_limit: int = 5,
     replace_more_threshold: int = 10,
-) -> pd.DataFrame:
+    submissions_per_minute: int = 60,
+    fmt: str = 'csv',
+    delta_only: bool = False,
+    source: str = 'praw',
+    cache_db: Optional[str] = None,
+    cache_max_age: Optional[float] = None,
+    json_requests_per_minute: int = JSON_REQUESTS_PER_MINUTE,
+) -> int:
     """Create a comments CSV with 'delta_awarded' True for parent comments OP awarded.
 
-    Two-pass logic per submission:
-      1) Find OP delta award comments (by OP) and collect the parent comment ids.
-      2) Emit all comments with a 'delta_awarded' flag if their id is in that parent set.
+    Submissions are read from `submissions_csv` and fetched in parallel, one
+    worker thread per client in `clients` (see scan_comments). Those flagged
+    `has_delta_from_op` are scanned first; with `delta_only` the rest are
+    dropped. Files without that column (e.g. data/cmv_posts.csv) are treated
+    as unflagged. Output is CSV, or Parquet with `fmt='parquet'`; returns the
+    row count.
     """
-    subs = pd.read_csv(submissions_csv)
+    # only these columns are needed here; skip parsing the others
+    subs = read_frame(
+        submissions_csv,
+        ['id', 'author'],
+        {'id': 'string', 'author': 'string', 'has_delta_from_op': 'boolean', 'num_comments': 'Int64'},
+        optional=['has_delta_from_op', 'num_comments'],
+    )
     subs = subs[subs['author'].notna() & (subs['author'].str.lower() != '[deleted]')].copy()
+    if 'has_delta_from_op' not in subs:
+        subs['has_delta_from_op'] = False
+    subs['has_delta_from_op'] = subs['has_delta_from_op'].fillna(False)
+    if 'num_comments' not in subs:
+        subs['num_comments'] = None  # unknown: cached forests cannot be trusted
+    if delta_only:
+        subs = subs[subs['has_delta_from_op']]
     subs = subs.head(n_submissions)
+    subs = subs.sort_values('has_delta_from_op', ascending=False, kind='stable')
+
+    return scan_comments(
+        make_client_pool(clients, submissions_per_minute),
+        len(clients),
+        zip(
+            subs['id'].to_numpy(),
+            subs['author'].astype(str).to_numpy(),
+            subs['has_delta_from_op'].to_numpy(dtype=bool),
+            subs['num_comments'].to_numpy(dtype=object),
+        ),
+        outfile,
+        max_comments=max_comments,
+        replace_more_limit=replace_more_limit,
+        replace_more_threshold=replace_more_threshold,
+        fmt=fmt,
+        expected=len(subs),
+        delta_only=delta_only,
+        source=source,
+        cache_db=cache_db,
+        cache_max_age=cache_max_age,
+        json_requests_per_minute=json_requests_per_minute,
+    )
 
-    rows = []
-    total = 0
 
-    for _, srow in tqdm(subs.iterrows(), total=len(subs), desc='Scanning submissions'):
-        sid = srow['id']
-        op = str(srow['author'])
-        subm = reddit.submission(id=sid)
-        subm.comment_sort = 'top'
-        subm.comments.replace_more(limit=replace_more_limit, threshold=replace_more_threshold)
-
-        comment_list = subm.comments.list()
-
-        # pass 1: detect which parent comment ids received a delta from OP
-        awarded_parent_ids: Set[str] = set()
-        for c in comment_list:
-            c_body = getattr(c, 'body', '') or ''
-            c_author = str(getattr(c, 'author', None)) if getattr(c, 'author', None) else None
-            if (c_author == op) and has_delta(c_body):
-                parent_full = getattr(c, 'parent_id', '') or ''
-                if parent_full.startswith('t1_'):  # parent is a comment
-                    awarded_parent_ids.add(parent_full.split('_', 1)[1])
-
-        # pass 2: emit rows (minimal but useful schema)
-        for c in comment_list:
-            if total >= max_comments:
-                break
-            parent_full = getattr(c, 'parent_id', '') or ''
-            parent_comment_id = parent_full.split('_', 1)[1] if parent_full.startswith('t1_') else None
-
-            rows.append({
-                'comment_id': getattr(c, 'id', None),
-                'post_id': sid,
-                'parent_comment_id': parent_comment_id,
-                'score': getattr(c, 'score', None),
-                'author': str(getattr(c, 'author', None)) if getattr(c, 'author', None) else None,
-                'is_op': (str(getattr(c, 'author', None)) == op) if getattr(c, 'author', None) else False,
-                'delta_awarded': (getattr(c, 'id', None) in awarded_parent_ids),
-                'body': getattr(c, 'body', '') or '',
-                'permalink': f"https://reddit.com{getattr(c, 'permalink', '')}",
-                'created_utc': getattr(c, 'created_utc', None),
-                'depth': getattr(c, 'depth', None),
-            })
-            total += 1
-
-        if total >= max_comments:
-            break
+# -------------------------
+# Pipeline
+# -------------------------
 
-    df = pd.DataFrame(rows)
-    Path(outfile).parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(outfile, index=False)
-    print(f'Wrote {len(df)} rows to {outfile}')
-    return df
+def build_all_pipelined(
+    clients: List[praw.Reddit],
+    submissions_out: str,
+    comments_out: str,
+    subreddit_name: str = 'changemyview',
+    time_filter: str = 'all',
+    limit: int = 1000,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    n_submissions: int = 50,
+    max_comments: int = 1000,
+    replace_more_limit: int = 5,
+    replace_more_threshold: int = 10,
+    submissions_per_minute: int = 60,
+    fmt: str = 'csv',
+    delta_only: bool = False,
+    source: str = 'praw',
+    cache_db: Optional[str] = None,
+    cache_max_age: Optional[float] = None,
+    json_requests_per_minute: int = JSON_REQUESTS_PER_MINUTE,
+    queue_size: int = 64,
+) -> int:
+    """Run the submissions and comments stages concurrently.
+
+    A producer thread builds the submissions file and, as each usable
+    submission is fetched, puts `(id, OP)` on a bounded queue that feeds
+    scan_comments. The producer checks its client out of the same pool as the
+    comment workers, so with a single client the stages still take turns.
+    With `delta_only`, only submissions whose flair shows a delta from OP are
+    queued. Returns the number of comment rows written.
+    """
+    pool = make_client_pool(clients, submissions_per_minute)
+    targets: "queue.Queue[Optional[Tuple[str, str, bool, Optional[int]]]]" = queue.Queue(maxsize=queue_size)
+    queued = 0
+    sent_sentinel = False
+    errors: List[BaseException] = []
+
+    def end_targets() -> None:
+        nonlocal sent_sentinel
+        if not sent_sentinel:
+            sent_sentinel = True
+            targets.put(None)
+
+    def on_row(row: tuple) -> None:
+        nonlocal queued
+        sid, author = row[0], row[2]
+        if sent_sentinel or not author or author.lower() == '[deleted]':
+            return
+        flagged = flair_is_delta_from_op(row[SUBMISSION_FIELDS.index('link_flair_text')])
+        if delta_only and not flagged:
+            return
+        num_comments = row[SUBMISSION_FIELDS.index('num_comments')]
+        targets.put((sid, author, flagged, num_comments))
+        queued += 1
+        if queued >= n_submissions:
+            end_targets()
+
+    def produce() -> None:
+        client, bucket = pool.get()
+        try:
+            build_submissions_csv(
+                client,
+                outfile=submissions_out,
+                subreddit_name=subreddit_name,
+                time_filter=time_filter,
+                limit=limit,
+                after=after,
+                before=before,
+                fmt=fmt,
+                on_row=on_row,
+            )
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            pool.put((client, bucket))
+            end_targets()
+
+    if n_submissions <= 0:
+        end_targets()  # nothing to scan; the producer still writes the submissions file
+
+    producer = threading.Thread(target=produce, name='submissions-producer', daemon=True)
+    producer.start()
+    try:
+        total = scan_comments(
+            pool,
+            len(clients),
+            iter(targets.get, None),
+            comments_out,
+            max_comments=max_comments,
+            replace_more_limit=replace_more_limit,
+            replace_more_threshold=replace_more_threshold,
+            fmt=fmt,
+            expected=n_submissions,
+            delta_only=delta_only,
+            source=source,
+            cache_db=cache_db,
+            cache_max_age=cache_max_age,
+            json_requests_per_minute=json_requests_per_minute,
+        )
+    finally:
+        # unblock the producer if the comments stage stopped early
+        while producer.is_alive():
+            try:
+                targets.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+    if errors:
+        raise errors[0]
+    return total
 
 
 # -------------------------
@@ -228,35 +958,61 @@ def main():
     p.add_argument('--subreddit', default='changemyview')
     p.add_argument('--time_filter', default='all', choices=['day','week','month','year','all'])
     p.add_argument('--limit', type=int, default=1000, help='Top submissions to fetch')
+    p.add_argument('--after', type=int, default=None, help='Epoch seconds; list ids from the archive instead of top')
+    p.add_argument('--before', type=int, default=None, help='Epoch seconds; list ids from the archive instead of top')
     p.add_argument('--n_submissions', type=int, default=100, help='How many submissions to scan for comments')
     p.add_argument('--max_comments', type=int, default=50000)
     p.add_argument('--replace_more_limit', type=int, default=0)
     p.add_argument('--replace_more_threshold', type=int, default=0)
+    p.add_argument('--submissions_per_minute', type=int, default=60, help='Comment forests fetched per minute per client')
+    p.add_argument('--format', default='csv', choices=['csv', 'parquet'],
+                   help='Output format (parquet needs pyarrow)')
+    p.add_argument('--delta_only', action='store_true',
+                   help='Only scan submissions whose flair shows a delta from OP')
+    p.add_argument('--comment_source', default='praw', choices=['praw', 'json'],
+                   help="Fetch comment trees via PRAW or the public .json endpoint")
+    p.add_argument('--json_requests_per_minute', type=int, default=JSON_REQUESTS_PER_MINUTE,
+                   help='Shared rate limit for --comment_source json (per IP, not per client)')
+    p.add_argument('--cache_db', default='data/cache.db',
+                   help="SQLite cache of fetched comment forests ('' to disable); "
+                        "a forest is refetched when its submission's num_comments changes")
+    p.add_argument('--cache_max_age', type=float, default=None,
+                   help='Refetch cached forests older than this many seconds')
     args = p.parse_args()
 
-    reddit = get_reddit()
-
-    # 1) Submissions CSV
-    build_submissions_csv(
-        reddit,
-        outfile=args.submissions_out,
+    if args.format == 'parquet':
+        # keep the extension honest when the default .csv paths are used;
+        # explicitly given paths are left alone
+        for key in ('submissions_out', 'comments_out'):
+            if getattr(args, key) == p.get_default(key):
+                setattr(args, key, str(Path(getattr(args, key)).with_suffix('.parquet')))
+
+    clients = get_reddit()
+
+    # Submissions and comments run concurrently: comment forests are fetched
+    # as soon as their submission ids come off the listing.
+    build_all_pipelined(
+        clients,
+        submissions_out=args.submissions_out,
+        comments_out=args.comments_out,
         subreddit_name=args.subreddit,
         time_filter=args.time_filter,
         limit=args.limit,
-    )
-
-    # 2) Comments CSV
-    build_comments_csv(
-        reddit,
-        submissions_csv=args.submissions_out,
-        outfile=args.comments_out,
+        after=args.after,
+        before=args.before,
         n_submissions=args.n_submissions,
         max_comments=args.max_comments,
         replace_more_limit=args.replace_more_limit,
         replace_more_threshold=args.replace_more_threshold,
+        submissions_per_minute=args.submissions_per_minute,
+        fmt=args.format,
+        delta_only=args.delta_only,
+        source=args.comment_source,
+        cache_db=args.cache_db or None,
+        cache_max_age=args.cache_max_age,
+        json_requests_per_minute=args.json_requests_per_minute,
     )
 
 
 if __name__ == '__main__':
-    from pathlib import Path
     main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+_hot.py — Per-comment predicates for cmv_scrape.py
+
+These run once per comment/submission, so they live in their own small,
+fully typed module that mypyc can compile to a C extension:
+
+    pip install mypy
+    mypyc _hot.py      # run inside example_approach/
+
+The scraper imports the compiled module when it exists and this source file
+otherwise; behaviour is identical either way.
+"""
+
+from typing import Any, Final, List, Optional, Tuple
+
+
+# A small but practical list of delta cues (example .py + a couple extras)
+DELTA_TOKENS: Final[List[str]] = [
+    '∆', '\u2206', '!delta', 'delta awarded', 'i award you a delta',
+    'i award a delta', "i'm awarding a delta", 'i am awarding a delta'
+]
+
+# lowered (and de-duplicated) once at import; matching runs on lowered text
+_DELTA_TOKENS_LOWER: Final[Tuple[str, ...]] = tuple(dict.fromkeys(tok.lower() for tok in DELTA_TOKENS))
+
+
+def _build_automaton() -> Any:
+    try:
+        import ahocorasick  # type: ignore  # optional: pip install pyahocorasick
+    except ImportError:
+        return None
+    automaton = ahocorasick.Automaton()
+    for tok in _DELTA_TOKENS_LOWER:
+        automaton.add_word(tok, tok)
+    automaton.make_automaton()
+    return automaton
+
+
+_DELTA_AUTOMATON: Final[Any] = _build_automaton()
+
+
+def flair_is_delta_from_op(flair: Optional[str]) -> bool:
+    """Heuristic: submissions whose flair text mentions a delta from OP."""
+    if not flair:
+        return False
+    t = str(flair).strip().lower()
+    return ('delta' in t) and ('from op' in t)
+
+
+def has_delta_lower(t: str) -> bool:
+    """has_delta() for text the caller has already lowercased."""
+    if _DELTA_AUTOMATON is not None:
+        # single linear scan for all tokens, stopping at the first match
+        return next(_DELTA_AUTOMATON.iter(t), None) is not None
+    for tok in _DELTA_TOKENS_LOWER:
+        if tok in t:
+            return True
+    return False
+
+
+def has_delta(text: Optional[str]) -> bool:
+    """Does the text look like an OP awarding a delta?"""
+    if not text:
+        return False
+    return has_delta_lower(str(text).lower())